@@ -4,7 +4,8 @@
 
 __version__ = '0.3'
 
-from libdebuginfod.debuginfod import DebugInfoD, ProgressFunction, \
-                                     get_buildid_from_path
+from libdebuginfod.debuginfod import DebugInfoD, ProgressFunction, BuildID, \
+                                     get_buildid_from_path, \
+                                     get_buildids_from_paths, get_default_client
 
-__all__ = ['DebugInfoD', 'ProgressFunction']
+__all__ = ['DebugInfoD', 'ProgressFunction', 'BuildID', 'get_default_client']
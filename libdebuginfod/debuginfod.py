@@ -23,36 +23,74 @@ Example:
 
 [0]: https://sourceware.org/elfutils/Debuginfod.html
 '''
+import asyncio
+import atexit
+import errno
+import mmap
 import os
+import queue
+import struct
+import threading
+import time
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 from ctypes import util
-from ctypes import CDLL, c_char_p, c_void_p, c_int, c_long, CFUNCTYPE, Array
-from ctypes import get_errno, create_string_buffer, byref, cast
+from ctypes import CDLL, c_char_p, c_void_p, c_int, c_long, CFUNCTYPE
+from ctypes import get_errno, byref
+
+from typing import Dict, Iterable, Optional, TextIO, Tuple, Union
+
+# libc is always loaded into the process, so free() can be resolved through
+# dlopen(NULL) without searching for the library file.
+_free = CDLL(None).free
+_free.argtypes = [c_void_p]
+_free.restype = None
 
-from typing import Optional, TextIO, Tuple, Union
+class BuildID:
+    '''A build ID which has already been converted for use with libdebuginfod.
+
+    Objects of this class are created by DebugInfoD.prepare_buildid() and can
+    be passed to all find_* methods instead of a bytes or str build ID. This
+    avoids converting the same build ID again on every lookup.
+    '''
 
-from elftools.elf.elffile import ELFFile
+    __slots__ = ('_buildid', '_size')
 
-def _convert_to_string_buffer(buildid: Union[bytes, str]) -> Tuple[Array, int]:
-    '''Convert a given buffer (bytes or str) to a ctypes string buffer.
+    def __init__(self, buildid: Union[bytes, str]):
+        self._buildid, self._size = _convert_to_string_buffer(buildid)
+
+    def __repr__(self):
+        return 'BuildID({!r})'.format(self._buildid if self._size
+                                      else self._buildid.decode('utf-8'))
+
+def _convert_to_string_buffer(buildid: Union[bytes, str, BuildID]) -> Tuple[bytes, int]:
+    '''Convert a given buffer (bytes or str) to an argument for c_char_p.
 
     Similar to the interface of libdebuginfod itself, all find_* functions can
     be called with either a sequence of bytes or a string. In the latter case,
     0 should be provided in the build_id_len parameter, while the actual number
     of bytes should be reported for a byte string.
 
+    ctypes passes bytes objects to c_char_p parameters as a pointer to their
+    (NUL-terminated) internal buffer, so no intermediate string buffer needs
+    to be created.
+
     Args:
-        buildid (bytes or str): the input buildid to be converted
+        buildid (bytes, str or BuildID): the input buildid to be converted
 
     Returns:
-        A tuple containing the ctypes string buffer as the first element and
-        an integer with the correct value to pass in the build_id_len parameter
-        to libdebuginfo.so.
+        A tuple containing the bytes to pass as the build_id parameter as the
+        first element and an integer with the correct value to pass in the
+        build_id_len parameter to libdebuginfo.so.
     '''
     if isinstance(buildid, str):
-        return create_string_buffer(buildid.encode('utf-8')), 0
-    buf = create_string_buffer(buildid)
-    return buf, len(buf)-1
+        return buildid.encode('utf-8'), 0
+    if isinstance(buildid, BuildID):
+        return buildid._buildid, buildid._size
+    return buildid, len(buildid)
 
 # typedef int (*debuginfod_progressfn_t)(debuginfod_client *client,
 #                                        long a, long b);
@@ -71,6 +109,9 @@ could be determined.
 The callback function must return 0 to continue the download, any other value
 will stop the download as soon as possible.
 
+DebugInfoD.set_progressfn() also accepts plain Python functions and wraps them
+(throttled to 100 milliseconds by default) in a ProgressFunction itself.
+
 Example:
     def progress(client, a, b):
         print(a, b)
@@ -82,9 +123,75 @@ Example:
         ...
 '''
 
+# Layout of the parts of the ELF header and section headers which are needed to
+# locate the .note.gnu.build-id section, indexed by EI_CLASS (1: 32 bit, 2: 64
+# bit). The byte order prefix is added depending on EI_DATA.
+# Elf_Ehdr: e_shoff, e_shentsize, e_shnum, e_shstrndx
+_ELF_EHDR = {1: ('I', 32, 'HHH', 46), 2: ('Q', 40, 'HHH', 58)}
+# Elf_Shdr: sh_name, sh_type, sh_flags, sh_addr, sh_offset, sh_size, sh_link
+_ELF_SHDR = {1: 'IIIIIII', 2: 'IIQQQQI'}
+_ELF_BYTE_ORDER = {1: '<', 2: '>'}
+_EI_NIDENT = 16
+_SHT_NOBITS = 8
+_NT_GNU_BUILD_ID = 3
+
+def _read_buildid(elf: mmap.mmap) -> Optional[str]:
+    '''Read the build ID from a memory mapped ELF file.
+
+    Raises:
+        ValueError: The mapped file is not a valid ELF file.
+    '''
+    if len(elf) < _EI_NIDENT or elf[:4] != b'\x7fELF' \
+            or elf[4] not in _ELF_EHDR or elf[5] not in _ELF_BYTE_ORDER:
+        raise ValueError('not a valid ELF file')
+    order = _ELF_BYTE_ORDER[elf[5]]
+    off_fmt, off_pos, idx_fmt, idx_pos = _ELF_EHDR[elf[4]]
+    shdr = struct.Struct(order + _ELF_SHDR[elf[4]])
+    try:
+        e_shoff, = struct.unpack_from(order + off_fmt, elf, off_pos)
+        e_shentsize, e_shnum, e_shstrndx = struct.unpack_from(order + idx_fmt,
+                                                              elf, idx_pos)
+        if not e_shoff:
+            return None
+        if e_shentsize < shdr.size:
+            raise ValueError('not a valid ELF file')
+        # Large values are stored in the first section header instead.
+        _, _, _, _, _, sh_size, sh_link = shdr.unpack_from(elf, e_shoff)
+        if e_shnum == 0:
+            e_shnum = sh_size
+        if e_shstrndx == 0xffff:
+            e_shstrndx = sh_link
+
+        strtab = shdr.unpack_from(elf, e_shoff + e_shstrndx * e_shentsize)[4]
+        name = b'.note.gnu.build-id\0'
+        for idx in range(e_shnum):
+            sh_name, sh_type, _, _, sh_offset, sh_size, _ = \
+                shdr.unpack_from(elf, e_shoff + idx * e_shentsize)
+            if sh_type == _SHT_NOBITS or \
+                    elf[strtab + sh_name:strtab + sh_name + len(name)] != name:
+                continue
+            # Walk the notes in the section: Elf_Nhdr is the same for 32 and
+            # 64 bit files, name and descriptor are padded to 4 bytes.
+            pos, end = sh_offset, sh_offset + sh_size
+            while pos + 12 <= end:
+                namesz, descsz, n_type = struct.unpack_from(order + 'III',
+                                                            elf, pos)
+                desc = pos + 12 + ((namesz + 3) & ~3)
+                if n_type == _NT_GNU_BUILD_ID and \
+                        elf[pos + 12:pos + 12 + namesz] == b'GNU\0':
+                    return elf[desc:desc + descsz].hex()
+                pos = desc + ((descsz + 3) & ~3)
+    except struct.error:
+        raise ValueError('not a valid ELF file') from None
+    return None
+
 def get_buildid_from_path(path: Union[bytes, str]) -> Optional[str]:
     '''Read the build ID from the binary at path.
 
+    Only the ELF header, the section headers and the .note.gnu.build-id
+    section are read from a memory mapping of the file, the rest of the ELF
+    file is not parsed.
+
     Args:
         path: the path to an ELF file from which the build ID should be read.
 
@@ -94,43 +201,166 @@ def get_buildid_from_path(path: Union[bytes, str]) -> Optional[str]:
 
     Raises:
         OSError: Opening the requested file failed.
-        ELFError: The file at the requested path is not a valid ELF file.
+        ValueError: The file at the requested path is not a valid ELF file.
     '''
-    buildid = None
     with open(path, 'rb') as elffd:
-        id_section = ELFFile(elffd).get_section_by_name('.note.gnu.build-id')
-        if id_section:
-            for note in id_section.iter_notes():
-                if note['n_type'] != 'NT_GNU_BUILD_ID':
-                    continue
-                buildid = note['n_desc']
-    return buildid
+        try:
+            elf = mmap.mmap(elffd.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped.
+            raise ValueError('not a valid ELF file') from None
+        with elf:
+            return _read_buildid(elf)
+
+def _try_get_buildid(path: Union[bytes, str]) -> Optional[str]:
+    '''Like get_buildid_from_path(), but return None on errors.'''
+    try:
+        return get_buildid_from_path(path)
+    except (OSError, ValueError):
+        return None
+
+def _file_size(path: Union[bytes, str]) -> int:
+    '''Return the size of the file at path or 0 if it cannot be accessed.'''
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return 0
+
+def get_buildids_from_paths(paths: Iterable[Union[bytes, str]]) \
+        -> Dict[Union[bytes, str], Optional[str]]:
+    '''Read the build IDs from several binaries in parallel.
+
+    The files are read in a thread pool, starting with the smallest files so
+    that a few large files do not delay the rest.
+
+    Args:
+        paths: the paths to the ELF files from which the build IDs should be
+            read.
+
+    Returns:
+        An ordered dictionary mapping every path (in input order, without
+        duplicates) to the build ID of the file as a lowercase hex string. The
+        build ID is None if the file did not contain a .note.gnu.build-id
+        section, could not be opened or is not a valid ELF file.
+    '''
+    buildids = OrderedDict.fromkeys(paths)
+    by_size = sorted(buildids, key=_file_size)
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        buildids.update(zip(by_size, pool.map(_try_get_buildid, by_size)))
+    return buildids
+
+# Maximum number of concurrent lookups (and connection handles) for the
+# find_*_async methods of a single DebugInfoD object.
+_ASYNC_POOL_SIZE = 16
+
+@lru_cache(maxsize=None)
+def _load_libdebuginfod() -> CDLL:
+    '''Load libdebuginfod.so and declare the prototypes of its functions.
+
+    The library is only searched for and loaded once per process. As ctypes
+    caches the function objects on the returned CDLL object, the argtypes and
+    restype declarations below are shared by all DebugInfoD instances.
+
+    Returns:
+        The CDLL handle for libdebuginfod.so.
+
+    Raises:
+        FileNotFoundError: libdebuginfod.so was not found in the system.
+    '''
+    searched_library = util.find_library('debuginfod')
+    if not searched_library:
+        raise FileNotFoundError('libdebuginfod not found, please install it first!')
+    handle = CDLL(searched_library, use_errno=True)
+
+    handle.debuginfod_begin.restype = c_void_p
+    handle.debuginfod_end.argtypes = [c_void_p]
+    handle.debuginfod_end.restype = None
+    handle.debuginfod_find_debuginfo.argtypes = [c_void_p, c_char_p, c_int,
+                                                 c_void_p]
+    handle.debuginfod_find_debuginfo.restype = c_int
+    handle.debuginfod_find_executable.argtypes = [c_void_p, c_char_p, c_int,
+                                                  c_void_p]
+    handle.debuginfod_find_executable.restype = c_int
+    handle.debuginfod_find_source.argtypes = [c_void_p, c_char_p, c_int,
+                                              c_char_p, c_void_p]
+    handle.debuginfod_find_source.restype = c_int
+    handle.debuginfod_set_progressfn.argtypes = [c_void_p, c_void_p]
+    handle.debuginfod_set_progressfn.restype = None
+    if hasattr(handle, 'debuginfod_set_verbose_fd'):
+        handle.debuginfod_set_verbose_fd.argtypes = [c_void_p, c_int]
+        handle.debuginfod_set_verbose_fd.restype = None
+    if hasattr(handle, 'debuginfod_get_url'):
+        handle.debuginfod_get_url.argtypes = [c_void_p]
+        handle.debuginfod_get_url.restype = c_char_p
+    if hasattr(handle, 'debuginfod_add_http_header'):
+        handle.debuginfod_add_http_header.argtypes = [c_void_p, c_char_p]
+        handle.debuginfod_add_http_header.restype = c_int
+    return handle
 
 class DebugInfoD:
     '''A wrapper class providing Python bindings for libdebuginfo.so operations.
     '''
 
-    def __init__(self):
+    __slots__ = ('_handle', '_begin', '_end', '_find_debuginfo',
+                 '_find_executable', '_find_source', '_set_progressfn',
+                 '_set_verbose_fd', '_get_url', '_add_http_header', '_client',
+                 '_progressfn', '_neg_cache', '_neg_cache_ttl', '_pool',
+                 '_pool_clients', '_path_p', '_path_ref', '__weakref__')
+
+    def __init__(self, neg_cache_ttl: float = 60):
         '''Initialize the DebugInfoD object.
 
         If the environment variable DEBUGINFOD_URLS is not set, it is
         initialized to point to the federating server provided by elfutils,
         located at https://debuginfod.elfutils.org/.
 
+        Lookups for which the server reported that the requested file does not
+        exist (-ENOENT) are remembered for neg_cache_ttl seconds. Repeating
+        such a lookup in this time returns the cached error code without
+        querying the server again.
+
+        The connection handle is not created here, but by begin(), when
+        entering a with block or on the first lookup. Constructing a DebugInfoD
+        object is therefore cheap and does not allocate any resources in
+        libdebuginfod.so.
+
+        Args:
+            neg_cache_ttl (float): The number of seconds a failed lookup is
+                cached. A value of 0 or less disables the cache.
+
         Raises:
             FileNotFoundError: libdebuginfod.so was not found in the system.
-            OSError: Creating the connection handle for this session failed.
         '''
-        searched_library = util.find_library('debuginfod')
-        if not searched_library:
-            raise FileNotFoundError('libdebuginfod not found, please install it first!')
-        self._handle = CDLL(searched_library, use_errno=True)
-        self._handle_libc = CDLL(util.find_library('c'))
-        self._handle_libc.free.argtypes = [c_void_p]
+        self._handle = _load_libdebuginfod()
+
+        self._begin = self._handle.debuginfod_begin
+        self._end = self._handle.debuginfod_end
+        self._find_debuginfo = self._handle.debuginfod_find_debuginfo
+        self._find_executable = self._handle.debuginfod_find_executable
+        self._find_source = self._handle.debuginfod_find_source
+        self._set_progressfn = self._handle.debuginfod_set_progressfn
+        # The following functions are not available in all versions of
+        # libdebuginfod.so, so they are set to None if they are missing.
+        self._set_verbose_fd = getattr(self._handle,
+                                       'debuginfod_set_verbose_fd', None)
+        self._get_url = getattr(self._handle, 'debuginfod_get_url', None)
+        self._add_http_header = getattr(self._handle,
+                                        'debuginfod_add_http_header', None)
+
         if not os.environ.get('DEBUGINFOD_URLS', None):
             os.environ['DEBUGINFOD_URLS'] = 'https://debuginfod.elfutils.org/'
         self._client = None
-        self.begin()
+        self._progressfn = None
+        self._neg_cache = {}
+        self._neg_cache_ttl = neg_cache_ttl
+        self._pool = None
+        self._pool_clients = None
+        # The char ** out parameter of the find_* functions. As a connection
+        # handle must not be used concurrently anyway, a single pointer (and
+        # reference to it) per object is reused for all lookups.
+        self._path_p = c_char_p()
+        self._path_ref = byref(self._path_p)
 
     def __enter__(self):
         '''Allow DebugInfoD to be used as a context manager.'''
@@ -145,73 +375,163 @@ class DebugInfoD:
     def begin(self):
         '''Create a connection handle.
 
+        Calling this method is optional, all methods using the connection
+        handle create it on demand. Calling begin() on an object with an
+        existing connection handle has no effect.
+
         Raises:
             OSError: Creating the connection handle for this session failed.
         '''
         if self._client:
             return
-        self._handle.debuginfod_begin.restype = c_void_p
-        self._client = self._handle.debuginfod_begin()
+        self._client = self._begin()
         if not self._client:
-            errno = get_errno()
-            raise OSError(errno, os.strerror(errno))
+            err = get_errno()
+            raise OSError(err, os.strerror(err))
 
     # void debuginfod_end(debuginfod_client *client);
     def end(self):
-        '''Release all state and storage for the current connection handle.'''
+        '''Release all state and storage for the current connection handle.
+
+        This also shuts down the worker threads and connection handles used by
+        the find_*_async methods. It blocks until all pending asynchronous
+        lookups have finished, so when called from a coroutine (e.g., by
+        leaving a with block), all lookups should have been awaited before.
+        Otherwise, the event loop is stalled until the downloads complete.
+        '''
+        if self._pool is not None:
+            self._pool.shutdown()
+            while not self._pool_clients.empty():
+                self._pool_clients.get_nowait().end()
+            self._pool = None
+            self._pool_clients = None
         if self._client:
-            self._handle.debuginfod_end.argtypes = [c_void_p]
-            self._handle.debuginfod_end(self._client)
+            self._end(self._client)
             self._client = None
 
-    # int debuginfod_find_debuginfo(debuginfod_client *client,
-    #                               const unsigned char *build_id,
-    #                               int build_id_len,
-    #                               char ** path);
-    def find_debuginfo(self, buildid: Union[bytes, str]) -> Tuple[int, Optional[bytes]]:
-        '''Retrieve the debug information file for a given build ID
+    def _neg_cache_lookup(self, key) -> Optional[int]:
+        '''Return the cached error code for key or None if there is none.'''
+        entry = self._neg_cache.get(key)
+        if entry is None:
+            return None
+        res, expiry = entry
+        if time.monotonic() < expiry:
+            return res
+        # The cache may be shared with pooled clients in other threads which
+        # could have removed the entry in the meantime.
+        self._neg_cache.pop(key, None)
+        return None
+
+    def _neg_cache_store(self, key, res: int) -> None:
+        '''Remember a failed lookup for key if the file does not exist.'''
+        # Only cache negative answers from the server, not transient errors
+        # like timeouts or aborted downloads.
+        if res != -errno.ENOENT or self._neg_cache_ttl <= 0:
+            return
+        now = time.monotonic()
+        # Drop all expired entries so that the cache does not grow without
+        # bound when many different build IDs are looked up. The items are
+        # copied first as the cache may be shared with pooled clients.
+        for old_key, (_, expiry) in list(self._neg_cache.items()):
+            if expiry <= now:
+                self._neg_cache.pop(old_key, None)
+        self._neg_cache[key] = (res, now + self._neg_cache_ttl)
+
+    @staticmethod
+    def prepare_buildid(buildid: Union[bytes, str]) -> BuildID:
+        '''Convert a build ID once for repeated use in the find_* methods
+
+        When the same build ID is used for several lookups (e.g., debug info,
+        executable and source files), converting it once and passing the
+        returned object to the find_* methods avoids repeating the conversion.
 
         Args:
             buildid (bytes or str): The build ID of the binary file
 
         Returns:
-            A tuple with an open file descriptor (<int>) and a <bytes>
-            representation of the path to the retrieved source code file.
+            A BuildID object which can be passed to all find_* methods.
+        '''
+        return BuildID(buildid)
 
-            In case of an error (e.g., DEBUGINFOD_URLS is not set or no debug
-            info was found), the file descriptor is a negative error code
-            (essentially an errno value) and the path is set to None.
+    def _find(self, fn, kind: str, buildid: Union[bytes, str, BuildID],
+              filename: Optional[Union[bytes, str]] = None) \
+            -> Tuple[int, Optional[bytes]]:
+        '''Common implementation of the find_* methods.
 
-            Example: (3, b'$HOME/.cache/debuginfod_client/{buildid}/debuginfo)
+        Args:
+            fn: The debuginfod_find_* function to call.
+            kind (str): The type of the requested file, used in the key for
+                the negative cache.
+            buildid (bytes, str or BuildID): The build ID of the binary file
+            filename (bytes or str): The source file path for
+                debuginfod_find_source(), None for all other functions.
         '''
-        path_p = c_char_p()
         buildid_str, size = _convert_to_string_buffer(buildid)
-        self._handle.debuginfod_find_debuginfo.argtypes = [c_void_p, c_char_p,
-                                                           c_int, c_void_p]
-
-        res = self._handle.debuginfod_find_debuginfo(self._client, buildid_str,
-                                                     size, byref(path_p))
+        if filename is None:
+            args = ()
+            key = (buildid_str, size, kind)
+        else:
+            filename_str, _ = _convert_to_string_buffer(filename)
+            args = (filename_str,)
+            key = (buildid_str, size, kind, filename_str)
+        res = self._neg_cache_lookup(key)
+        if res is not None:
+            return res, None
+        if not self._client:
+            self.begin()
+        res = fn(self._client, buildid_str, size, *args, self._path_ref)
         if res < 0:
+            self._neg_cache_store(key, res)
             return res, None
         # From os.path documentation: Unfortunately, some file names may not be
         # representable as strings on Unix, so applications that need to
         # support arbitrary file names on Unix should use bytes objects to
         # represent path names.
-        path = cast(path_p, c_char_p).value
+        path = self._path_p.value
         # If path is not NULL and the query is successful, path is set to the
         # path of the file in the cache. The caller must free() this value.
-        self._handle_libc.free(path_p)
+        _free(self._path_p)
+        # Reset the out parameter to NULL so that the freed pointer is never
+        # read or freed again by a later lookup.
+        self._path_p.value = None
         return res, path
 
+    # int debuginfod_find_debuginfo(debuginfod_client *client,
+    #                               const unsigned char *build_id,
+    #                               int build_id_len,
+    #                               char ** path);
+    def find_debuginfo(self, buildid: Union[bytes, str, BuildID]) \
+            -> Tuple[int, Optional[bytes]]:
+        '''Retrieve the debug information file for a given build ID
+
+        Args:
+            buildid (bytes, str or BuildID): The build ID of the binary file
+
+        Returns:
+            A tuple with an open file descriptor (<int>) and a <bytes>
+            representation of the path to the retrieved source code file.
+
+            In case of an error (e.g., DEBUGINFOD_URLS is not set or no debug
+            info was found), the file descriptor is a negative error code
+            (essentially an errno value) and the path is set to None.
+
+            Example: (3, b'$HOME/.cache/debuginfod_client/{buildid}/debuginfo)
+
+        Raises:
+            OSError: Creating the connection handle for this session failed.
+        '''
+        return self._find(self._find_debuginfo, 'debuginfo', buildid)
+
     # int debuginfod_find_executable(debuginfod_client *client,
     #                                const unsigned char *build_id,
     #                                int build_id_len,
     #                                char ** path);
-    def find_executable(self, buildid: Union[bytes, str]) -> Tuple[int, Optional[bytes]]:
+    def find_executable(self, buildid: Union[bytes, str, BuildID]) \
+            -> Tuple[int, Optional[bytes]]:
         '''Retrieve the executable file for a given build ID
 
         Args:
-            buildid (bytes or str): The build ID of the binary file
+            buildid (bytes, str or BuildID): The build ID of the binary file
 
         Returns:
             A tuple with an open file descriptor (<int>) and a <bytes>
@@ -222,31 +542,24 @@ class DebugInfoD:
             (essentially an errno value) and the path is set to None.
 
             Example: (3, b'$HOME/.cache/debuginfod_client/{buildid}/executable)
-        '''
-        path_p = c_char_p()
-        buildid_str, size = _convert_to_string_buffer(buildid)
-        self._handle.debuginfod_find_executable.argtypes = [c_void_p, c_char_p,
-                                                            c_int, c_void_p]
 
-        res = self._handle.debuginfod_find_executable(self._client, buildid_str,
-                                                      size, byref(path_p))
-        if res < 0:
-            return res, None
-        path = cast(path_p, c_char_p).value
-        self._handle_libc.free(path_p)
-        return res, path
+        Raises:
+            OSError: Creating the connection handle for this session failed.
+        '''
+        return self._find(self._find_executable, 'executable', buildid)
 
     # int debuginfod_find_source(debuginfod_client *client,
     #                            const unsigned char *build_id,
     #                            int build_id_len,
     #                            const char *filename,
     #                            char ** path);
-    def find_source(self, buildid: Union[bytes, str], filename: Union[bytes, str]) \
+    def find_source(self, buildid: Union[bytes, str, BuildID],
+                    filename: Union[bytes, str]) \
             -> Tuple[int, Optional[bytes]]:
         '''Retrieve the source code for a given build ID and filename
 
         Args:
-            buildid (bytes or str):  The build ID of the binary file
+            buildid (bytes, str or BuildID): The build ID of the binary file
             filename (bytes or str): The absolute path to the source file as
                 given in the DWARF information.
 
@@ -259,41 +572,126 @@ class DebugInfoD:
             (essentially an errno value) and the path is set to None.
 
             Example: (3, b'$HOME/.cache/debuginfod_client/{buildid}/source/{filename})
+
+        Raises:
+            OSError: Creating the connection handle for this session failed.
         '''
-        path_p = c_char_p()
-        buildid_str, size = _convert_to_string_buffer(buildid)
-        filename_str, _ = _convert_to_string_buffer(filename)
-        self._handle.debuginfod_find_source.argtypes = [c_void_p, c_char_p, c_int,
-                                                        c_char_p, c_void_p]
+        return self._find(self._find_source, 'source', buildid, filename)
 
-        res = self._handle.debuginfod_find_source(self._client, buildid_str,
-                                                  size, filename_str,
-                                                  byref(path_p))
-        if res < 0:
-            return res, None
-        path = cast(path_p, c_char_p).value
-        self._handle_libc.free(path_p)
-        return res, path
+    def _run_pooled(self, method, *args):
+        '''Run method on a pooled client (called from a worker thread).'''
+        # Connection handles are not thread-safe, so every worker thread needs
+        # exclusive access to a client. At most _ASYNC_POOL_SIZE clients are
+        # created as there are no more worker threads.
+        try:
+            client = self._pool_clients.get_nowait()
+        except queue.Empty:
+            client = DebugInfoD(self._neg_cache_ttl)
+            client._neg_cache = self._neg_cache
+        try:
+            return method(client, *args)
+        finally:
+            self._pool_clients.put(client)
+
+    async def _run_async(self, method, *args):
+        '''Run method on a pooled client in the thread pool of this object.'''
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=_ASYNC_POOL_SIZE)
+            self._pool_clients = queue.Queue()
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._pool, self._run_pooled, method,
+                                          *args)
+
+    async def find_debuginfo_async(self, buildid: Union[bytes, str, BuildID]) \
+            -> Tuple[int, Optional[bytes]]:
+        '''Retrieve the debug information file for a given build ID (async)
+
+        The lookup is run in a thread pool on a separate connection handle, so
+        several lookups can be awaited concurrently (e.g., with
+        asyncio.gather()). The negative cache is shared with this object, but
+        settings like HTTP headers, the progress function or the verbose file
+        descriptor do not apply to these lookups.
+
+        See find_debuginfo() for arguments and return values.
+        '''
+        return await self._run_async(DebugInfoD.find_debuginfo, buildid)
+
+    async def find_executable_async(self, buildid: Union[bytes, str, BuildID]) \
+            -> Tuple[int, Optional[bytes]]:
+        '''Retrieve the executable file for a given build ID (async)
+
+        See find_debuginfo_async() for details on concurrency and
+        find_executable() for arguments and return values.
+        '''
+        return await self._run_async(DebugInfoD.find_executable, buildid)
+
+    async def find_source_async(self, buildid: Union[bytes, str, BuildID],
+                                filename: Union[bytes, str]) \
+            -> Tuple[int, Optional[bytes]]:
+        '''Retrieve the source code for a given build ID and filename (async)
+
+        See find_debuginfo_async() for details on concurrency and
+        find_source() for arguments and return values.
+        '''
+        return await self._run_async(DebugInfoD.find_source, buildid, filename)
 
     # void debuginfod_set_progressfn(debuginfod_client *client,
     #                                debuginfod_progressfn_t progressfn);
-    def set_progressfn(self, progressfn) -> None:
+    def set_progressfn(self, progressfn,
+                       min_interval_ms: Optional[int] = None) -> None:
         '''Set a callback function which is called during file download
 
+        libdebuginfod.so reports progress very frequently during a download.
+        As every callback means a transition from C into Python, the given
+        function can be throttled so that it is only called if at least
+        min_interval_ms milliseconds have passed since its last invocation.
+        The first call and the call for a completed download (a == b) are
+        always passed through. Suppressed calls return 0, i.e., continue the
+        download.
+
         Args:
-            progressfn (ProgressFunction): A function constructed with the
-                wrapper ProgressFunction (derived of ctypes.CFUNCTYPE) which
-                takes three parameters (debuginfod_client *, long a, long b).
-                a and b represent the fraction a/b of the current download
-                progress. b may be zero until the exact download size is known.
+            progressfn (ProgressFunction or callable): A function constructed
+                with the wrapper ProgressFunction (derived of ctypes.CFUNCTYPE)
+                or a plain Python function which takes three parameters
+                (debuginfod_client *, long a, long b). a and b represent the
+                fraction a/b of the current download progress. b may be zero
+                until the exact download size is known. None removes a
+                previously set callback.
+            min_interval_ms (int): The minimum interval between two calls to
+                progressfn in milliseconds. A value of 0 or less disables
+                throttling. By default, ProgressFunction objects are passed to
+                libdebuginfod.so unchanged and plain Python functions are
+                throttled to one call every 100 milliseconds.
         '''
-        # We already need a CFUNCTYPE object passed in, see the following
-        # excerpt from the ctypes documentation regarding callbacks:
+        if min_interval_ms is None:
+            min_interval_ms = 0 if isinstance(progressfn, ProgressFunction) \
+                else 100
+        if progressfn is None:
+            callback = None
+        elif min_interval_ms <= 0 and isinstance(progressfn, ProgressFunction):
+            callback = progressfn
+        else:
+            interval = min_interval_ms / 1000
+            last_call = None
+
+            def throttled(client, a, b):
+                nonlocal last_call
+                now = time.monotonic()
+                if last_call is not None and now - last_call < interval \
+                        and not 0 < b <= a:
+                    return 0
+                last_call = now
+                return progressfn(client, a, b)
+
+            callback = ProgressFunction(throttled)
+        # See the following excerpt from the ctypes documentation regarding
+        # callbacks:
         # Note: Make sure you keep references to CFUNCTYPE() objects as long as
         # they are used from C code. ctypes doesn’t, and if you don’t, they may
         # be garbage collected, crashing your program when a callback is made.
-        self._handle.debuginfod_set_progressfn.argtypes = [c_void_p, c_void_p]
-        self._handle.debuginfod_set_progressfn(self._client, progressfn)
+        self.begin()
+        self._progressfn = callback
+        self._set_progressfn(self._client, callback)
 
     # void debuginfod_set_verbose_fd(debuginfod_client *client, int fd);
     def set_verbose_fd(self, fd: TextIO) -> None:
@@ -306,11 +704,10 @@ class DebugInfoD:
             NotImplementedError: The backing libdebuginfod.so file does not
                 provide the debuginfod_set_verbose_fd() function.
         '''
-        try:
-            self._handle.debuginfod_set_verbose_fd.argtypes = [c_void_p, c_int]
-            self._handle.debuginfod_set_verbose_fd(self._client, fd.fileno())
-        except AttributeError:
-            raise NotImplementedError from None
+        if self._set_verbose_fd is None:
+            raise NotImplementedError
+        self.begin()
+        self._set_verbose_fd(self._client, fd.fileno())
 
     # void debuginfod_set_user_data(debuginfod_client *client, void *data);
     def set_user_data(self, data):
@@ -341,13 +738,12 @@ class DebugInfoD:
             NotImplementedError: The backing libdebuginfod.so file does not
                 provide the debuginfod_get_url() function.
         '''
-        try:
-            self._handle.debuginfod_get_url.argtypes = [c_void_p]
-            self._handle.debuginfod_get_url.restype = c_char_p
-            result = self._handle.debuginfod_get_url(self._client)
-            return result.decode('utf-8') if result else None
-        except AttributeError:
-            raise NotImplementedError from None
+        if self._get_url is None:
+            raise NotImplementedError
+        if not self._client:
+            return None
+        result = self._get_url(self._client)
+        return result.decode('utf-8') if result else None
 
     # int debuginfod_add_http_header(debuginfod_client *client,
     #                                const char* header);
@@ -364,16 +760,44 @@ class DebugInfoD:
             NotImplementedError: The backing libdebuginfod.so file does not
                 provide the debuginfod_add_http_header() function.
         '''
+        if self._add_http_header is None:
+            raise NotImplementedError
+        self.begin()
         header_str, _ = _convert_to_string_buffer(header)
-        try:
-            self._handle.debuginfod_add_http_header.argtypes = [c_void_p, c_char_p]
-            return self._handle.debuginfod_add_http_header(self._client,
-                                                           header_str)
-        except AttributeError:
-            raise NotImplementedError from None
+        return self._add_http_header(self._client, header_str)
 
     def __del__(self):
         '''Release all state and storage for the current connection handle.'''
         if self._client:
-            self._handle.debuginfod_end(self._client)
+            self._end(self._client)
             self._client = None
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+def get_default_client() -> DebugInfoD:
+    '''Return a process-wide DebugInfoD object.
+
+    The client is created on the first call and reused afterwards, so that
+    connections (including HTTP keep-alive and TLS sessions) are kept between
+    queries instead of being set up again for every DebugInfoD object. Its
+    connection handle is created on the first lookup and released when the
+    interpreter exits. Use a separate
+    DebugInfoD object if you need an isolated session (e.g., with custom HTTP
+    headers or a progress function).
+
+    Note that the connection handle of libdebuginfod is not thread-safe, so
+    the returned client must not be used by several threads at the same time.
+
+    Returns:
+        The shared DebugInfoD object.
+
+    Raises:
+        FileNotFoundError: libdebuginfod.so was not found in the system.
+    '''
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = DebugInfoD()
+            atexit.register(_default_client.end)
+        return _default_client
@@ -20,9 +20,6 @@ setup(
     packages = [
         'libdebuginfod'
     ],
-    install_requires = [
-        'pyelftools'
-    ],
     classifiers = [
         'License :: OSI Approved :: MIT License',
         'Topic :: Software Development :: Debuggers',
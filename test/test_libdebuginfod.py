@@ -2,12 +2,17 @@
 #
 # SPDX-License-Identifier: MIT
 
+import asyncio
+import errno
 import os
+import struct
+import tempfile
 import unittest
 
-from ctypes import sizeof
 from elftools.elf.elffile import ELFFile
-from libdebuginfod import DebugInfoD, get_buildid_from_path
+from libdebuginfod import DebugInfoD, ProgressFunction, \
+                          get_buildid_from_path, get_buildids_from_paths, \
+                          get_default_client
 from libdebuginfod.debuginfod import _convert_to_string_buffer
 
 # WARNING: These tests currently only work inside a Fedora Rawhide container
@@ -28,18 +33,59 @@ class TestDebugInfoD(unittest.TestCase):
     def test_0_get_buildid_from_path(self):
         self.assertIsNotNone(self.buildid)
 
+    def test_0_get_buildid_from_invalid_path(self):
+        with self.assertRaises(ValueError):
+            get_buildid_from_path(__file__)
+
+    def test_0_get_buildid_from_truncated_path(self):
+        with tempfile.NamedTemporaryFile() as truncated:
+            truncated.write(b'\x7fELF')
+            truncated.flush()
+            with self.assertRaises(ValueError):
+                get_buildid_from_path(truncated.name)
+
+    def test_0_get_buildid_from_invalid_shentsize(self):
+        # 64 bit little endian ELF header with e_shoff = 64 and
+        # e_shentsize = e_shnum = 0, followed by a section header with a huge
+        # sh_size (which would be taken as the number of sections).
+        header = b'\x7fELF\x02\x01\x01' + b'\x00' * 33 + \
+            struct.pack('<QIHHHHHH', 64, 0, 64, 0, 0, 0, 0, 0)
+        section = struct.pack('<IIQQQQIIQQ', 0, 0, 0, 0, 0, 1 << 40, 0, 0, 0, 0)
+        with tempfile.NamedTemporaryFile() as crafted:
+            crafted.write(header + section)
+            crafted.flush()
+            with self.assertRaises(ValueError):
+                get_buildid_from_path(crafted.name)
+
     def test_0_string_convert_to_string_buffer(self):
         test_str = '4d7e25cb25aefa300b44f32fe1fefe7bea76cb41'
         buf, buflen = _convert_to_string_buffer(test_str)
-        self.assertEqual(len(test_str) + 1, sizeof(buf))
+        self.assertEqual(test_str.encode('utf-8'), buf)
         self.assertEqual(0, buflen)
 
     def test_0_binary_convert_to_string_buffer(self):
         test_hex = b'\x4d\x7e\x25\xcb\x25\xae\xfa\x30\x0b\x44\xf3\x2f\xe1\xfe\xfe\x7b\xea\x76\xcb\x41'
         buf, buflen = _convert_to_string_buffer(test_hex)
-        self.assertEqual(len(test_hex) + 1, sizeof(buf))
+        self.assertEqual(test_hex, buf)
         self.assertEqual(len(test_hex), buflen)
 
+    def test_0_get_buildids_from_paths(self):
+        with tempfile.NamedTemporaryFile() as empty, \
+                tempfile.NamedTemporaryFile() as truncated:
+            truncated.write(b'\x7fELF')
+            truncated.flush()
+            paths = [__file__, TEST_BINARY, empty.name, truncated.name]
+            buildids = get_buildids_from_paths(paths)
+        self.assertEqual(paths, list(buildids))
+        self.assertEqual([None, self.buildid, None, None],
+                         list(buildids.values()))
+
+    def test_0_prepare_buildid(self):
+        test_str = '4d7e25cb25aefa300b44f32fe1fefe7bea76cb41'
+        buildid = DebugInfoD.prepare_buildid(test_str)
+        self.assertEqual(_convert_to_string_buffer(test_str),
+                         _convert_to_string_buffer(buildid))
+
     def test_1_get_debuginfo(self):
         with DebugInfoD() as client:
             fdesc, path = client.find_debuginfo(self.buildid)
@@ -55,12 +101,118 @@ class TestDebugInfoD(unittest.TestCase):
             # test case
             os.remove(path)
 
+    def test_1_get_debuginfo_without_begin(self):
+        client = DebugInfoD()
+        self.assertIsNone(client._client)
+        fdesc, path = client.find_debuginfo(self.buildid)
+        self.assertIsNotNone(client._client)
+        self.assertIsNotNone(path)
+        # The reused out parameter must be reset after free()
+        self.assertIsNone(client._path_p.value)
+        if fdesc > 0:
+            os.close(fdesc)
+        fdesc, second_path = client.find_debuginfo(self.buildid)
+        self.assertEqual(path, second_path)
+        self.assertIsNone(client._path_p.value)
+        if fdesc > 0:
+            os.close(fdesc)
+        os.remove(path)
+        client.end()
+        self.assertIsNone(client._client)
+
+    def test_1_get_debuginfo_default_client(self):
+        client = get_default_client()
+        self.assertIs(client, get_default_client())
+        fdesc, path = client.find_debuginfo(self.buildid)
+        self.assertIsNotNone(path)
+        if fdesc > 0:
+            os.close(fdesc)
+        os.remove(path)
+
+    def test_1_get_debuginfo_prepared_buildid(self):
+        with DebugInfoD() as client:
+            buildid = DebugInfoD.prepare_buildid(self.buildid)
+            fdesc, path = client.find_debuginfo(buildid)
+            self.assertIsNotNone(path)
+            self.assertIn(self.buildid.encode('utf-8'), path)
+            if fdesc > 0:
+                os.close(fdesc)
+            os.remove(path)
+
     def test_1_fail_get_debuginfo(self):
         with DebugInfoD() as client:
             fdesc, path = client.find_debuginfo(self.buildid + 'f')
             self.assertLess(fdesc, 0)
             self.assertIsNone(path)
 
+    def test_1_get_debuginfo_async(self):
+        async def lookup(client):
+            return await asyncio.gather(
+                client.find_debuginfo_async(self.buildid),
+                client.find_debuginfo_async(self.buildid + 'f'))
+
+        loop = asyncio.new_event_loop()
+        try:
+            with DebugInfoD() as client:
+                (fdesc, path), (fail_fdesc, fail_path) = \
+                    loop.run_until_complete(lookup(client))
+        finally:
+            loop.close()
+        self.assertIsNotNone(path)
+        if fdesc > 0:
+            os.close(fdesc)
+        os.remove(path)
+        self.assertLess(fail_fdesc, 0)
+        self.assertIsNone(fail_path)
+
+    def test_1_fail_get_debuginfo_cached(self):
+        buildid = '0' * 40
+        with DebugInfoD() as client:
+            fdesc, path = client.find_debuginfo(buildid)
+            self.assertEqual(-errno.ENOENT, fdesc)
+            self.assertIsNone(path)
+            self.assertIn((buildid.encode('utf-8'), 0, 'debuginfo'),
+                          client._neg_cache)
+            self.assertEqual((fdesc, None), client.find_debuginfo(buildid))
+        with DebugInfoD(neg_cache_ttl=0) as client:
+            fdesc, path = client.find_debuginfo(buildid)
+            self.assertLess(fdesc, 0)
+            self.assertEqual({}, client._neg_cache)
+
+    def test_1_set_progressfn(self):
+        calls = []
+        def progress(client, a, b):
+            calls.append((a, b))
+            return 0
+
+        ctypes_progress = ProgressFunction(progress)
+        with DebugInfoD() as client:
+            # ProgressFunction objects are not throttled by default
+            client.set_progressfn(ctypes_progress)
+            self.assertIs(client._progressfn, ctypes_progress)
+            fdesc, path = client.find_debuginfo(self.buildid)
+            if fdesc > 0:
+                os.close(fdesc)
+            self.assertIsNotNone(path)
+            os.remove(path)
+        self.assertGreater(len(calls), 0)
+
+        # Plain Python functions are wrapped and throttled to 100ms by default
+        del calls[:]
+        with DebugInfoD() as client:
+            client.set_progressfn(progress)
+            self.assertIsInstance(client._progressfn, ProgressFunction)
+            for a in range(1, 11):
+                self.assertEqual(0, client._progressfn(None, a, 10))
+        self.assertEqual([(1, 10), (10, 10)], calls)
+
+        del calls[:]
+        with DebugInfoD() as client:
+            client.set_progressfn(progress, min_interval_ms=0)
+            for a in range(1, 11):
+                client._progressfn(None, a, 10)
+        self.assertEqual(10, len(calls))
+
     def test_2_get_executable(self):
         with DebugInfoD() as client:
             fdesc, path = client.find_executable(self.buildid)